@@ -1,18 +1,144 @@
+import os
+import stat
+import atexit
+import weakref
+import tempfile
 from pathlib import Path
-from json import load, dump
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future
+from collections import namedtuple
+from functools import lru_cache, wraps
+from itertools import count
+import json
 from datetime import datetime as d
 from ..exceptions import *
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib encoder.
+    orjson = None
+
+_TS_FMT = '%d/%m/%Y %H:%M:%S'  # Timestamp format used in the metadata
+_LIST_PREFIX = 'LIST OF '  # Prefix of list column datatypes
+_LIST_PREFIX_LEN = len(_LIST_PREFIX)
+_MISSING = object()  # Stands in for columns a row has no value for
+_open_dbs = weakref.WeakSet()  # Databases whose commits are flushed at exit
+
+
+@atexit.register
+def _flush_open_dbs():
+    for db in list(_open_dbs):
+        db.flush()
+
+
+def _dumps(obj, pretty: bool = False) -> bytes:
+    """
+    Encodes obj to JSON bytes. Compact output goes through orjson when it is
+    available; pretty output always uses the stdlib for its 4-space indent.
+    Anything orjson refuses (e.g. ints wider than 64 bits) is retried with
+    the stdlib.
+    """
+    if pretty:
+        return json.dumps(obj, indent=4).encode()
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+def _file_mode(path: Path) -> int:
+    """
+    Returns the permission bits a rewrite of path should keep: those of the
+    existing file, or the umask default for a new one.
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def committer(func):
+    """
+    Commits the database after the decorated method returns, unless commits
+    are held back by JDaBa.buffered().
+    """
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        result = func(self, *args, **kwargs)
+        if not self._suspend:
+            self.commit()
+        return result
+    return wrapper
+
+
+@lru_cache(maxsize=128)
+def _row_type(columns: tuple[str, ...]) -> type:
+    """
+    Returns the namedtuple type for rows projected onto columns.
+    Column names that are not valid identifiers are renamed positionally.
+    """
+    return namedtuple('Row', columns, rename=True)
+
+
+@lru_cache(maxsize=None)
+def _where_fn(n: int):
+    """
+    Returns a generated function matching n column equalities in one pass:
+    match(keys, c0, ..., cn-1, v0, ..., vn-1) returns the keys whose values in
+    every column ci equal vi. Generating it keeps the per-row work down to
+    straight-line comparisons.
+    """
+    cols = ', '.join(f'c{i}' for i in range(n))
+    vals = ', '.join(f'v{i}' for i in range(n))
+    xs = ', '.join(f'x{i}' for i in range(n))
+    conds = ' and '.join(f'x{i} == v{i}' for i in range(n))
+    src = (f'def match(keys, {cols}, {vals}):\n'
+           f'    return [k for k, {xs} in zip(keys, {cols}) if {conds}]\n')
+    ns = {}
+    exec(src, ns)
+    return ns['match']
+
+
+def _loads(data: bytes):
+    """
+    Decodes JSON bytes, using orjson when it is available.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 class JDaBa(object):
     """
     A JSON-based database. Uses a JSON file to store data.
     Supports basic SQL-like commands in a Pythonic manner.
     Saves metadata (e.g. column datatypes) with the database.
     """
-    name: str = None  # Name of the database
-    table_names: list[str] = []  # List of table names
-    table_data: dict[str, dict[any, any]] = {}  # Data of each table
-    table_metadata: dict[str, dict[str, str]] = {}  # Metadata of each table
+    __slots__ = ('name', 'path', 'pretty', 'table_data', 'table_metadata',
+                 '_col_cache', '_col_store', '_indexes', '_row_seq', '_seq',
+                 '_dirty', '_suspend', '_writer', '_pending', '_size', '_mtime',
+                 '__weakref__')
+
+    name: str  # Name of the database
+    path: Path  # Path of the JSON file
+    pretty: bool  # Whether to pretty-print the JSON file
+    table_data: dict[str, dict[any, any]]  # Data of each table
+    table_metadata: dict[str, dict[str, str]]  # Metadata of each table
+    _col_cache: dict[str, frozenset]  # Column names of each table
+    _col_store: dict[str, tuple[list, dict[str, list]]]  # Column-wise views
+    _indexes: dict[str, dict[str, dict[any, dict[str, None]]]]  # Hash indexes
+    _row_seq: dict[str, dict[str, int]]  # Table position of rows in indexed tables
+    _seq: count  # Source of row positions
+    _dirty: bool  # Whether there are uncommitted changes
+    _suspend: bool  # Whether commits are held back by buffered()
+    _writer: ThreadPoolExecutor  # Background thread that writes commits
+    _pending: Future | None  # Last commit handed to the writer
+    _size: int | None  # Size of the JSON file as last read or written
+    _mtime: int | None  # Modification time (ns) of the JSON file, likewise
 
     datatypes: dict[str, type] = {
         'TEXT': str,
@@ -24,25 +150,47 @@ class JDaBa(object):
     Python methods
     """
 
-    def __init__(self, name: str, path: str = None):
+    def __init__(self, name: str, path: str = None, pretty: bool = False):
         """
         Initializes a JDaBa object.
         If the database file does not exist, it will be created. If it is not
         given a path, but a database with the same name exists in the current
-        working directory, it will be loaded.
+        working directory, it will be loaded. The JSON file is written
+        compactly unless pretty is set.
         """
         self.name = name
+        self.pretty = pretty
         self.path = Path.cwd() / (name + ".json") if path is None else Path(path)
+        self.table_data = {}
+        self.table_metadata = {}
+        self._col_cache = {}
+        self._col_store = {}
+        self._indexes = {}
+        self._row_seq = {}
+        self._seq = count()
+        self._dirty = False
+        self._suspend = False
+        self._writer = ThreadPoolExecutor(max_workers=1)
+        self._pending = None
+        self._size = None
+        self._mtime = None
+        _open_dbs.add(self)
         if not self.path.exists():
             self._create()
         else:
             self._json_load()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
     def __repr__(self):
         return f'JDaBa(db_name={self.name}, path={self.path})'
 
     def __str__(self):
-        return f'<JDaBa object: {self.name}. Path: {self.path}. Size: {self._get_size()} bytes. \nTables: {", ".join(self.table_names) if self.table_names else "None" }>'
+        return f'<JDaBa object: {self.name}. Path: {self.path}. Size: {self._get_size()} bytes. \nTables: {", ".join(self.table_data) if self.table_data else "None" }>'
 
     """
     JSON methods
@@ -50,23 +198,25 @@ class JDaBa(object):
 
     def _json_load(self):
         """
-        Loads the database from the JSON file. Only used in the initializer and
-        sync() method.
+        Loads the database from the JSON file. Used in the initializer, sync()
+        and rollback().
         """
-        with open(self.path, 'r') as f:
-            db = load(f)
-            for table in db:
-                self.table_names.append(table)
-                self.table_data[table] = db[table]
-            self.table_metadata = db['_metadata']
+        self._record_stat()
+        db = _loads(self.path.read_bytes())
+        self.table_data = db['tables']
+        self.table_metadata = db['_metadata']
+        self._col_cache = {
+            table: frozenset(columns)
+            for table, columns in self.table_metadata['meta_tables'].items()
+        }
+        self._col_store = {}
+        self._rebuild_indexes()
 
     def _data_roll_back(self):
         """
-        Rolls back the database data to the last commit.
+        Rolls back the database data and metadata to the last commit.
         """
-        with open(self.path, 'r') as f:
-            db = load(f)
-            self.table_data = db['tables']
+        self._json_load()
 
     def _collect(self) -> dict:
         """
@@ -78,12 +228,64 @@ class JDaBa(object):
             'tables': self.table_data
         }
 
-    def _json_dump(self):
+    def _snapshot(self) -> dict:
+        """
+        Collects a copy of the database object that later mutations cannot
+        reach. Tables and rows are copied, since update() changes rows in
+        place; row values themselves are shared.
+        """
+        metadata = dict(self.table_metadata)
+        metadata['meta_tables'] = dict(metadata['meta_tables'])
+        return {
+            '_metadata': metadata,
+            'tables': {table: {key: dict(row) for key, row in rows.items()}
+                       for table, rows in self.table_data.items()}
+        }
+
+    def _json_dump(self, db: dict = None):
+        """
+        Dumps the database, or the given collected db, to the JSON file.
+        Writes to a uniquely named temporary file next to it first and swaps
+        it in, so a crash mid-write leaves the old file intact.
         """
-        Dumps the database to the JSON file.
+        data = _dumps(self._collect() if db is None else db, self.pretty)
+        with tempfile.NamedTemporaryFile(dir=self.path.parent, prefix=self.path.name,
+                                         suffix='.tmp', delete=False) as f:
+            tmp = f.name
+            try:
+                os.chmod(tmp, _file_mode(self.path))
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            except BaseException:
+                f.close()
+                os.remove(tmp)
+                raise
+        try:
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self._record_stat()
+
+    def _write(self, db: dict):
         """
-        with open(self.path, 'w') as f:
-            dump(self._collect(), f, indent=4)
+        Runs on the writer thread. Marks the database dirty again if the
+        write fails, so the next commit retries it.
+        """
+        try:
+            self._json_dump(db)
+        except BaseException:
+            self._dirty = True
+            raise
+
+    def _record_stat(self):
+        """
+        Remembers the size and modification time of the JSON file, so sync()
+        can tell whether it changed since it was last read or written.
+        """
+        st = self.path.stat()
+        self._mtime, self._size = st.st_mtime_ns, st.st_size
 
     """
     Database internal methods
@@ -93,23 +295,22 @@ class JDaBa(object):
         """
         Creates a new database file. Only used in the initializer.
         """
+        now = d.now().strftime(_TS_FMT)
         self.table_metadata = {
-            'created_on': d.now().strftime('%d/%m/%Y %H:%M:%S'),
-            'last_updated': d.now().strftime('%d/%m/%Y %H:%M:%S'),
+            'created_on': now,
+            'last_updated': now,
             'meta_tables': {}
         }
-
-        self.db = {
-            '_metadata': self.table_metadata,  # Metadata
-            'tables': {}  # Data
-        }
         self._json_dump()
 
     def _get_size(self):
         """
-        Returns the size of the database file in bytes.
+        Returns the size of the database file in bytes, as of the last time
+        it was read or written by this object.
         """
-        return self.path.stat().st_size
+        if self._size is None:
+            self._size = self.path.stat().st_size
+        return self._size
 
     """
     Utility methods.
@@ -125,14 +326,15 @@ class JDaBa(object):
         return list(self._get_table_metadata(table_name).keys())
 
     def _table_exists(self, table_name: str) -> bool:
-        return table_name in self.table_names
+        return table_name in self.table_data
 
     def _row_exists(self, table_name: str, row_name: str) -> bool:
         return row_name in self.table_data[table_name]
 
     def _validate_row_data(self, table_name: str, row_name: str, data: dict) -> bool:
+        columns = self._col_cache[table_name]
         for key in data:
-            if key not in self._get_column_names(table_name):
+            if key not in columns:
                 raise NoSuchKeyError(
                     key, self._get_column_names(table_name))
 
@@ -140,22 +342,130 @@ class JDaBa(object):
             raise UniqueError(row_name)
         return True
 
-    def _validate_col_data_type(self, type: str) -> bool:
-        if type not in self.datatypes and "LIST OF" not in type:
-            raise NoSuchKeyError(type, list(self.datatypes.keys()))
-        elif "LIST OF" in type:
-            if type[8:] not in self.datatypes:
-                raise NoSuchKeyError(type[8:], list(self.datatypes.keys()))
+    def _validate_col_data_type(self, dtype: str) -> bool:
+        if dtype.startswith(_LIST_PREFIX):
+            dtype = dtype[_LIST_PREFIX_LEN:]
+        if dtype not in self.datatypes:
+            raise NoSuchKeyError(dtype, list(self.datatypes.keys()))
         return True
 
     def _col_exists(self, table_name: str, col_name: str) -> bool:
-        return col_name in self._get_column_names(table_name)
+        return col_name in self._col_cache[table_name]
 
-    def committer(func):
-        def wrapper(self, *args, **kwargs):
-            func(self, *args, **kwargs)
-            self.commit()
-        return wrapper
+    def _get_row_keys(self, table_name: str) -> list[str]:
+        """
+        Returns the row keys of a table in the order of its column-wise view.
+        The view is built on first use and dropped whenever the table changes.
+        """
+        if table_name not in self._col_store:
+            self._col_store[table_name] = (list(self.table_data[table_name]), {})
+        return self._col_store[table_name][0]
+
+    def _get_column(self, table_name: str, col_name: str) -> list:
+        """
+        Returns the values of one column, aligned with _get_row_keys().
+        """
+        self._get_row_keys(table_name)
+        columns = self._col_store[table_name][1]
+        if col_name not in columns:
+            columns[col_name] = [row.get(col_name, _MISSING)
+                                 for row in self.table_data[table_name].values()]
+        return columns[col_name]
+
+    def _unindexable(self, table_name: str, col_name: str, value) -> WrongDataTypeError:
+        return WrongDataTypeError(col_name, self._get_table_metadata(table_name)[col_name],
+                                  type(value).__name__)
+
+    def _check_indexable(self, table_name: str, data: dict):
+        """
+        Raises WrongDataTypeError if data holds an unhashable value for an
+        indexed column. Called before a row is changed, so a failure leaves
+        both the row and the indexes untouched.
+        """
+        for col_name in self._indexes.get(table_name, {}):
+            if col_name in data:
+                try:
+                    hash(data[col_name])
+                except TypeError:
+                    raise self._unindexable(table_name, col_name, data[col_name]) from None
+
+    def _build_index(self, table_name: str, col_name: str):
+        index = {}
+        for row_key, row in self.table_data[table_name].items():
+            if col_name in row:
+                try:
+                    index.setdefault(row[col_name], {})[row_key] = None
+                except TypeError:
+                    raise self._unindexable(table_name, col_name, row[col_name]) from None
+        if table_name not in self._row_seq:
+            self._row_seq[table_name] = {
+                row_key: next(self._seq) for row_key in self.table_data[table_name]}
+        self._indexes.setdefault(table_name, {})[col_name] = index
+
+    def _rebuild_indexes(self):
+        """
+        Rebuilds every index from table_data, dropping those whose table is
+        gone. Used after the data is reloaded from the JSON file.
+        """
+        indexes, self._indexes = self._indexes, {}
+        self._row_seq = {}
+        for table_name, columns in indexes.items():
+            if table_name in self.table_data:
+                for col_name in columns:
+                    try:
+                        self._build_index(table_name, col_name)
+                    except WrongDataTypeError:  # The file holds unhashable values.
+                        pass
+
+    def _index_add(self, table_name: str, row_key: str, row: dict):
+        if table_name in self._row_seq:
+            self._row_seq[table_name].setdefault(row_key, next(self._seq))
+        for col_name, index in self._indexes.get(table_name, {}).items():
+            if col_name in row:
+                index.setdefault(row[col_name], {})[row_key] = None
+
+    def _index_remove(self, table_name: str, row_key: str, row: dict):
+        for col_name, index in self._indexes.get(table_name, {}).items():
+            if col_name in row:
+                bucket = index[row[col_name]]
+                del bucket[row_key]
+                if not bucket:
+                    del index[row[col_name]]
+
+    def _index_drop(self, table_name: str, row_key: str, row: dict):
+        """
+        Removes a deleted row from the indexes and forgets its position.
+        """
+        self._index_remove(table_name, row_key, row)
+        if table_name in self._row_seq:
+            del self._row_seq[table_name][row_key]
+
+    def _match_rows(self, table_name: str, where: dict[str, any]) -> list[str]:
+        """
+        Returns the keys of the rows matching every equality in where. If all
+        where columns are indexed, the index buckets are intersected;
+        otherwise the referenced columns are scanned together in one pass.
+        """
+        if not where:
+            return list(self.table_data[table_name])
+        for k in where:
+            if not self._col_exists(table_name, k):
+                raise NoSuchKeyError(k, self._get_column_names(table_name))
+        indexes = self._indexes.get(table_name, {})
+        if all(k in indexes for k in where):
+            buckets = []
+            for k, v in where.items():
+                try:
+                    buckets.append(indexes[k].get(v, {}))
+                except TypeError:  # Unhashable values match no indexed row.
+                    return []
+            smallest = min(buckets, key=len)
+            keys = [key for key in smallest if all(key in b for b in buckets)]
+            # Buckets are in index order; return the rows in table order.
+            return sorted(keys, key=self._row_seq[table_name].__getitem__)
+        keys = self._get_row_keys(table_name)
+        cols = [self._get_column(table_name, k) for k in where]
+        return _where_fn(len(where))(keys, *cols, *where.values())
 
     """
     Instance methods
@@ -163,116 +473,213 @@ class JDaBa(object):
 
     def sync(self):
         """
-        Synchronizes the database object with the JSON file.
+        Synchronizes the database object with the JSON file. The file is only
+        parsed again if it changed on disk or there are uncommitted changes.
         """
+        self.flush()
+        if not self._dirty:
+            st = self.path.stat()
+            if (st.st_mtime_ns, st.st_size) == (self._mtime, self._size):
+                return
         self._json_load()
+        self._dirty = False
 
     def commit(self):
         """
-        Commits the database object to the JSON file.
+        Commits the database object to the JSON file. Does nothing if there
+        are no changes since the last commit. The file is written by a
+        background thread; a commit that has not started writing yet is
+        replaced by the newer one, while one that is being written is waited
+        for. Use flush() to wait for the write. If the previous write failed,
+        its exception is raised here and the changes stay uncommitted.
         """
-        self.table_metadata['last_updated'] = d.now().strftime(
-            '%d/%m/%Y %H:%M:%S')
-        self._json_dump()
+        if not self._dirty:
+            return
+        pending = self._pending
+        if pending is not None and not pending.cancel():
+            self._pending = None
+            pending.result()
+        self.table_metadata['last_updated'] = d.now().strftime(_TS_FMT)
+        self._dirty = False
+        self._pending = self._writer.submit(self._write, self._snapshot())
+
+    def flush(self):
+        """
+        Waits for the last commit to be written to the JSON file. Raises the
+        exception of the write if it failed.
+        """
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            if not pending.cancelled():
+                pending.result()
+
+    def close(self):
+        """
+        Waits for the last commit to be written and stops the background
+        writer. The object should not be committed to afterwards.
+        """
+        _open_dbs.discard(self)
+        try:
+            self.flush()
+        finally:
+            self._writer.shutdown()
 
     def rollback(self):
         """
         Rolls back the database object to the last commit.
         """
+        self.flush()
         self._data_roll_back()
+        self._dirty = False
 
+    @contextmanager
+    def buffered(self):
+        """
+        Holds back commits made by mutating methods until the block exits,
+        then commits once. If the outermost block raises, the database is
+        rolled back to the last commit. Nested blocks neither commit nor roll
+        back themselves: both are left to the outermost block, so an inner
+        block whose exception is caught keeps its changes.
+        """
+        suspended, self._suspend = self._suspend, True
+        try:
+            yield self
+        except BaseException:
+            if not suspended:
+                self.rollback()
+            raise
+        finally:
+            self._suspend = suspended
+        if not suspended:
+            self.commit()
+
+    @committer
     def create_table(self, table_name: str, columns: dict[str, str]):
         """
         Creates a new table in the database. Checks if the table already exists,
         if the columns are valid, and if the column datatypes are valid.
         """
         if self._table_exists(table_name):
-            raise NoSuchTableError(table_name, self.table_names)
+            raise NoSuchTableError(table_name, list(self.table_data))
         for key in columns:
             self._validate_col_data_type(columns[key])
-        self.table_names.append(table_name)
         self.table_data[table_name] = {}
         self.table_metadata['meta_tables'][table_name] = columns
-        self._json_dump()
+        self._col_cache[table_name] = frozenset(columns)
+        self._dirty = True
+
+    def create_index(self, table: str, column: str):
+        """
+        Builds a hash index on a column, so that equality WHERE clauses on
+        indexed columns are answered without scanning the table. Indexes are
+        kept in memory only. LIST OF columns cannot be indexed.
+        """
+        if not self._table_exists(table):
+            raise NoSuchTableError(table, list(self.table_data))
+        if not self._col_exists(table, column):
+            raise NoSuchKeyError(column, self._get_column_names(table))
+        dtype = self._get_table_metadata(table)[column]
+        if dtype not in self.datatypes:
+            raise WrongDataTypeError(column, list(self.datatypes.keys()), dtype)
+        self._build_index(table, column)
+
+    def _select_rows(self, table: str, where: dict[str, any]):
+        if not self._table_exists(table):
+            raise NoSuchTableError(table, list(self.table_data))
+        tbl = self.table_data[table]
+        if where:
+            return [tbl[key] for key in self._match_rows(table, where)]
+        return tbl.values()
 
     def select(self, table: str, columns: list[str] = None, where: dict[str, any] = None) -> list[dict[str, any]]:
         columns, where = columns or [], where or {}
+        rows = self._select_rows(table, where)
+        col_tuple = tuple(columns)
         result = []
-        if not self._table_exists(table):
-            raise NoSuchTableError(table, self.table_names)
-        for row in self.table_data[table]:
-            if where:
-                for key in where:
-                    if self.table_data[table][row][key] != where[key]:
-                        break
-                else:
-                    selected_row = self.table_data[table][row]
-                    if columns:
-                        selected_row = {
-                            key: selected_row[key] for key in columns}
-                    result.append(selected_row)
-            else:
-                selected_row = self.table_data[table][row]
-                if columns:
-                    selected_row = {key: selected_row[key] for key in columns}
-                result.append(selected_row)
+        for row in rows:
+            result.append({k: row[k] for k in col_tuple} if col_tuple else row)
 
         return result
 
+    def select_tuples(self, table: str, columns: list[str] = None, where: dict[str, any] = None) -> list[tuple]:
+        """
+        Like select(), but returns each row as a namedtuple of the requested
+        columns (all columns by default). Rows share one tuple type per column
+        selection; columns a row has no value for are None.
+        """
+        rows = self._select_rows(table, where or {})
+        col_tuple = tuple(columns or self._get_column_names(table))
+        for k in col_tuple:
+            if not self._col_exists(table, k):
+                raise NoSuchKeyError(k, self._get_column_names(table))
+        make = _row_type(col_tuple)._make
+        return [make([row.get(k) for k in col_tuple]) for row in rows]
+
+    @committer
     def insert(self, table: str, row: str=None, data: dict[str, any]=None):
-        if not row and not data:
+        if row is None and not data:
             raise NoDataInsertError()
-        row, data = row or None, data or {}
+        data = data or {}
         if not self._table_exists(table):
-            raise NoSuchTableError(table, self.table_names)
-        if not row:
+            raise NoSuchTableError(table, list(self.table_data))
+        if row is None:
             row = str(len(self.table_data[table]))
         self._validate_row_data(table, row, data)
+        self._check_indexable(table, data)
+        self._index_add(table, row, data)
         self.table_data[table][row] = data
+        self._col_store.pop(table, None)
+        self._dirty = True
 
+    @committer
     def delete(self, table: str, row: str=None, where: dict[str, any]=None):
-        row, where = row or None, where or {}
+        where = where or {}
 
         if not self._table_exists(table):
-            raise NoSuchTableError(table, self.table_names)
+            raise NoSuchTableError(table, list(self.table_data))
 
+        tbl = self.table_data[table]
         keys_to_delete = []
 
-        if row:
+        if row is not None:
             if not self._row_exists(table, row):
-                raise NoSuchKeyError(row, list(self.table_data[table].keys()))
+                raise NoSuchKeyError(row, list(tbl.keys()))
             keys_to_delete.append(row)
         elif where:
-            for row_key in self.table_data[table]:
-                for key in where:
-                    if self.table_data[table][row_key][key] != where[key]:
-                        break
-                else:
-                    keys_to_delete.append(row_key)
+            keys_to_delete = self._match_rows(table, where)
 
         # Now, iterate over the keys outside the loop to delete them
         for key in keys_to_delete:
-            del self.table_data[table][key]
+            self._index_drop(table, key, tbl[key])
+            del tbl[key]
+        if keys_to_delete:
+            self._col_store.pop(table, None)
+            self._dirty = True
 
+    @committer
     def update(self, table: str, row: str=None, where: dict[str, any]=None, data: dict[str, any]=None):
-        row, where, data = row or None, where or {}, data or {}
+        where, data = where or {}, data or {}
 
         if not self._table_exists(table):
-            raise NoSuchTableError(table, self.table_names)
+            raise NoSuchTableError(table, list(self.table_data))
+        tbl = self.table_data[table]
 
-        if not row and not where:
+        if row is None and not where:
             raise NoDataInsertError()
 
-        if row:
+        if row is not None:
             if not self._row_exists(table, row):
-                raise NoSuchKeyError(row, list(self.table_data[table].keys()))
+                raise NoSuchKeyError(row, list(tbl.keys()))
+            row_keys = [row]
+        else:
+            row_keys = self._match_rows(table, where)
+        self._check_indexable(table, data)
+        for row_key in row_keys:
+            row_data = tbl[row_key]
+            self._index_remove(table, row_key, row_data)
             for key in data:
-                self.table_data[table][row][key] = data[key]
-        elif where:
-            for row_key in self.table_data[table]:
-                for key in where:
-                    if self.table_data[table][row_key][key] != where[key]:
-                        break
-                else:
-                    for key in data:
-                        self.table_data[table][row_key][key] = data[key]
\ No newline at end of file
+                row_data[key] = data[key]
+            self._index_add(table, row_key, row_data)
+        if row_keys and data:
+            self._col_store.pop(table, None)
+            self._dirty = True
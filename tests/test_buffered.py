@@ -0,0 +1,78 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from JDaBa.db import JDaBa
+
+
+class BufferedTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / 'db.json'
+        self.db = JDaBa('db', self.path)
+        self.addCleanup(self.db.close)
+        self.db.create_table('t', {'name': 'TEXT'})
+
+    def on_disk(self):
+        self.db.flush()
+        with JDaBa('db', self.path) as db:
+            return db.select('t')
+
+    def test_raising_block_is_rolled_back(self):
+        with self.assertRaises(ValueError):
+            with self.db.buffered():
+                self.db.insert('t', 'a', {'name': 'a'})
+                raise ValueError
+        self.db.insert('t', 'b', {'name': 'b'})
+        self.assertEqual(self.on_disk(), [{'name': 'b'}])
+
+    def test_nested_blocks_commit_once(self):
+        with self.db.buffered():
+            with self.db.buffered():
+                self.db.insert('t', 'a', {'name': 'a'})
+            self.assertTrue(self.db._dirty)
+        self.assertEqual(self.on_disk(), [{'name': 'a'}])
+
+    def test_no_match_does_not_commit(self):
+        self.db.insert('t', 'a', {'name': 'a'})
+        self.db.flush()
+        self.db.delete('t', where={'name': 'z'})
+        self.db.update('t', where={'name': 'z'}, data={'name': 'b'})
+        self.assertFalse(self.db._dirty)
+        self.assertIsNone(self.db._pending)
+
+    def test_raising_block_rolls_back_created_table(self):
+        with self.assertRaises(ValueError):
+            with self.db.buffered():
+                self.db.create_table('ghost', {'name': 'TEXT'})
+                raise ValueError
+        self.db.insert('t', 'a', {'name': 'a'})
+        self.db.flush()
+        with JDaBa('db', self.path) as db:
+            self.assertEqual(list(db.table_metadata['meta_tables']), ['t'])
+            self.assertEqual(list(db.table_data), ['t'])
+        self.db.create_table('ghost', {'name': 'TEXT'})
+
+    def test_raising_inner_block_leaves_outer_changes(self):
+        with self.db.buffered():
+            self.db.insert('t', 'a', {'name': 'a'})
+            with self.assertRaises(ValueError):
+                with self.db.buffered():
+                    self.db.insert('t', 'b', {'name': 'b'})
+                    raise ValueError
+            self.assertEqual(self.db.select('t'), [{'name': 'a'}, {'name': 'b'}])
+        self.assertEqual(self.on_disk(), [{'name': 'a'}, {'name': 'b'}])
+
+    def test_raising_outer_block_rolls_back_inner_changes(self):
+        with self.assertRaises(ValueError):
+            with self.db.buffered():
+                with self.db.buffered():
+                    self.db.insert('t', 'a', {'name': 'a'})
+                raise ValueError
+        self.assertEqual(self.db.select('t'), [])
+        self.assertEqual(self.on_disk(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+from concurrent.futures import wait
+
+from JDaBa.db import JDaBa
+
+
+class CommitTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / 'db.json'
+        self.db = JDaBa('db', self.path)
+        self.addCleanup(self.db.close)
+        self.db.create_table('t', {'name': 'TEXT'})
+        self.db.flush()
+
+    def on_disk(self):
+        with JDaBa('db', self.path) as db:
+            return db.select('t')
+
+    def block_writer(self):
+        """
+        Occupies the writer thread until the returned event is set.
+        """
+        release, started = threading.Event(), threading.Event()
+
+        def wait():
+            started.set()
+            release.wait()
+        self.db._writer.submit(wait)
+        started.wait()
+        self.addCleanup(release.set)
+        return release
+
+    def test_snapshot_ignores_later_updates(self):
+        release = self.block_writer()
+        self.db.insert('t', 'a', {'name': 'committed'})
+        with self.assertRaises(ValueError):
+            with self.db.buffered():
+                self.db.update('t', where={'name': 'committed'},
+                               data={'name': 'aborted'})
+                release.set()
+                self.db.flush()
+                self.assertEqual(self.on_disk(), [{'name': 'committed'}])
+                raise ValueError
+        self.assertEqual(self.db.select('t'), [{'name': 'committed'}])
+
+    def test_values_orjson_rejects(self):
+        self.db.insert('t', 5, {'name': 'int key'})
+        self.db.insert('t', 'big', {'name': 2 ** 70})
+        self.db.flush()
+        self.assertEqual(self.on_disk(), [{'name': 'int key'}, {'name': 2 ** 70}])
+
+    def test_file_mode_is_kept(self):
+        self.path.chmod(0o640)
+        self.db.insert('t', 'a', {'name': 'a'})
+        self.db.flush()
+        self.assertEqual(self.path.stat().st_mode & 0o777, 0o640)
+
+    def test_queued_commits_coalesce(self):
+        release = self.block_writer()
+        with mock.patch.object(JDaBa, '_json_dump', autospec=True,
+                               side_effect=JDaBa._json_dump) as dump:
+            for name in 'abc':
+                self.db.insert('t', name, {'name': name})
+            release.set()
+            self.db.flush()
+        self.assertEqual(dump.call_count, 1)
+        self.assertEqual(self.on_disk(), [{'name': 'a'}, {'name': 'b'}, {'name': 'c'}])
+
+    def test_running_write_is_waited_for(self):
+        release, started = threading.Event(), threading.Event()
+        real_dump = JDaBa._json_dump
+
+        def slow_dump(db, *args):
+            started.set()
+            release.wait()
+            real_dump(db, *args)
+        with mock.patch.object(JDaBa, '_json_dump', autospec=True,
+                               side_effect=slow_dump) as dump:
+            self.db.insert('t', 'a', {'name': 'a'})
+            started.wait()
+            running = self.db._pending
+            threading.Timer(0.05, release.set).start()
+            self.db.insert('t', 'b', {'name': 'b'})
+            self.assertTrue(running.done())
+            self.db.flush()
+        self.assertEqual(dump.call_count, 2)
+        self.assertEqual(self.on_disk(), [{'name': 'a'}, {'name': 'b'}])
+
+    def test_failed_write_raises_from_flush_and_is_retried(self):
+        self.db.insert('t', 'a', {'name': {'unserialisable'}})
+        with self.assertRaises(TypeError):
+            self.db.flush()
+        self.assertTrue(self.db._dirty)
+        self.db.update('t', 'a', data={'name': 'fixed'})
+        self.db.flush()
+        self.assertEqual(self.on_disk(), [{'name': 'fixed'}])
+
+    def test_failed_write_raises_from_next_commit(self):
+        self.db.insert('t', 'a', {'name': {'unserialisable'}})
+        wait([self.db._pending])
+        with self.assertRaises(TypeError):
+            self.db.insert('t', 'b', {'name': 'b'})
+        self.assertTrue(self.db._dirty)
+        self.db.delete('t', 'a')
+        self.db.flush()
+        self.assertEqual(self.on_disk(), [{'name': 'b'}])
+
+    def test_close(self):
+        self.db.insert('t', 'a', {'name': 'a'})
+        self.db.close()
+        self.assertEqual(self.on_disk(), [{'name': 'a'}])
+        with self.assertRaises(RuntimeError):
+            self.db._writer.submit(print)
+
+    def test_context_manager_closes(self):
+        with JDaBa('db', self.path) as db:
+            db.insert('t', 'b', {'name': 'b'})
+        self.assertEqual(self.on_disk(), [{'name': 'b'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from JDaBa.db import JDaBa
+from JDaBa.exceptions import WrongDataTypeError
+
+
+class IndexTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db = JDaBa('indexed', Path(tmp.name) / 'indexed.json')
+        self.ref = JDaBa('scanned', Path(tmp.name) / 'scanned.json')
+        self.addCleanup(self.db.close)
+        self.addCleanup(self.ref.close)
+        for db in (self.db, self.ref):
+            db.create_table('t', {'name': 'TEXT', 'age': 'NUMERIC'})
+        self.db.create_index('t', 'name')
+        self.db.create_index('t', 'age')
+
+    def both(self, method, *args, **kwargs):
+        for db in (self.db, self.ref):
+            getattr(db, method)('t', *args, **kwargs)
+
+    def assertSameSelect(self, where):
+        self.assertEqual(self.db.select('t', where=where),
+                         self.ref.select('t', where=where))
+
+    def test_insert(self):
+        self.both('insert', 'r1', {'name': 'x', 'age': 10})
+        self.both('insert', 'r2', {'name': 'y', 'age': 10})
+        self.both('insert', 'r3', {'name': 'x'})
+        self.assertSameSelect({'name': 'x'})
+        self.assertSameSelect({'age': 10})
+        self.assertSameSelect({'name': 'x', 'age': 10})
+        self.assertEqual(self.db.select('t', where={'name': 'z'}), [])
+
+    def test_update_keeps_table_order(self):
+        for i, name in enumerate('xyxx'):
+            self.both('insert', f'r{i}', {'name': name, 'age': i})
+        self.both('update', 'r0', data={'age': 10})
+        self.both('update', where={'name': 'y'}, data={'name': 'x'})
+        self.assertEqual([row['age'] for row in self.db.select('t', where={'name': 'x'})],
+                         [10, 1, 2, 3])
+        self.assertSameSelect({'name': 'x'})
+        self.assertSameSelect({'age': 10})
+        self.assertSameSelect({'age': 0})
+
+    def test_delete(self):
+        for i, name in enumerate('xyxy'):
+            self.both('insert', f'r{i}', {'name': name, 'age': i})
+        self.both('delete', 'r0')
+        self.both('delete', where={'name': 'y', 'age': 3})
+        self.assertSameSelect({'name': 'x'})
+        self.assertSameSelect({'name': 'y'})
+        self.assertSameSelect({'age': 0})
+
+    def test_unhashable_update_leaves_row_indexed(self):
+        self.db.insert('t', 'r1', {'name': 'x', 'age': 1})
+        with self.assertRaises(WrongDataTypeError):
+            self.db.update('t', row='r1', data={'name': ['x', 'y']})
+        self.assertEqual(self.db.select('t', where={'name': 'x'}),
+                         [{'name': 'x', 'age': 1}])
+        self.db.update('t', row='r1', data={'name': 'z'})
+        self.assertEqual(self.db.select('t', where={'name': 'z'}),
+                         [{'name': 'z', 'age': 1}])
+
+    def test_matches_full_scan(self):
+        rng = random.Random(0)
+        for step in range(2000):
+            op = rng.random()
+            where = {'name': rng.choice('wxyz')}
+            if rng.random() < 0.5:
+                where['age'] = rng.randrange(4)
+            if op < 0.5:
+                self.both('insert', f'r{step}',
+                          {'name': rng.choice('wxyz'), 'age': rng.randrange(4)})
+            elif op < 0.7:
+                self.both('delete', where=dict(where))
+            elif op < 0.9:
+                self.both('update', where=dict(where), data={'age': step % 4})
+            self.assertSameSelect(where)
+
+    def test_rollback_rebuilds_indexes(self):
+        with self.db.buffered():
+            self.db.insert('t', 'r1', {'name': 'x', 'age': 1})
+        self.db.flush()
+        with self.db.buffered():
+            self.db.insert('t', 'r2', {'name': 'x', 'age': 2})
+            self.db.rollback()
+        self.assertEqual(self.db.select('t', where={'name': 'x'}),
+                         [{'name': 'x', 'age': 1}])
+
+
+if __name__ == '__main__':
+    unittest.main()